@@ -0,0 +1,21 @@
+"""ベンチマークのスクリプトで共通に使う関数"""
+import os
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(sorted_values, q):
+    # 昇順に並んだ値の q 分位点（0 <= q <= 1）。空ならNone
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def git_commit():
+    # 計測したコードのコミット（レポートに残す）。gitがなければNone
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
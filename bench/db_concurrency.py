@@ -0,0 +1,135 @@
+"""複数ワーカーからの書き込みスループットを SQLite のジャーナルモードごとに比べるベンチマーク
+
+    python bench/db_concurrency.py --workers 8 --seconds 10
+
+ワーカーごとに別プロセスで app を読み込み（gunicorn の複数ワーカーと同じ状況）、
+一時ファイルのDBに服の登録と一覧の読み込みを繰り返す。結果はモードごとに1行のJSONで出力する。
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from common import percentile  # noqa: E402
+
+
+def load_app(database_path, journal_mode):
+    # (app モジュール, アプリ) を返す。create_app() は環境変数から設定を読むので、先に設定する
+    os.environ['DATABASE_URL'] = 'sqlite:///' + database_path
+    os.environ['SQLITE_JOURNAL_MODE'] = journal_mode
+    sys.path.insert(0, ROOT)
+    import app as app_module
+    # 子プロセスの中で作るので、パスワードのハッシュ化にプロセスプールを使わない
+    # （multiprocessing の子プロセスは終了時に atexit を呼ばず、プールの join で止まる）
+    return app_module, app_module.create_app({'PASSWORD_HASH_WORKERS': 0})
+
+
+def worker(database_path, journal_mode, user_id, seconds, read_ratio, ready, start, results):
+    app_module, app = load_app(database_path, journal_mode)
+    db, Cloth = app_module.db, app_module.Cloth
+    writes = reads = errors = 0
+    latencies = []
+    with app.app_context():
+        # 全ワーカーの起動を待ってから同時に始める
+        ready.put(os.getpid())
+        start.wait()
+        deadline = time.time() + seconds
+        i = 0
+        while time.time() < deadline:
+            i += 1
+            started = time.perf_counter()
+            try:
+                if read_ratio and i % (read_ratio + 1):
+                    Cloth.query.filter_by(user_id=user_id).order_by(Cloth.id.desc()).limit(50).all()
+                    reads += 1
+                else:
+                    cloth = Cloth(user_id=user_id, image_path='uploads/bench.jpg', item_type='t-shirt',
+                                  color_name='white', color_hex='#ffffff', recommended_temp='18-28°C',
+                                  recommended_humidity='40-70%')
+                    app_module.apply_ranges(cloth)
+                    db.session.add(cloth)
+                    app_module.bump_wardrobe_version(user_id)
+                    db.session.commit()
+                    writes += 1
+                    latencies.append(time.perf_counter() - started)
+            except Exception:
+                # 'database is locked' などはエラーとして数える
+                db.session.rollback()
+                errors += 1
+    results.put({'writes': writes, 'reads': reads, 'errors': errors, 'latencies': latencies})
+
+
+def run(journal_mode, args):
+    directory = tempfile.mkdtemp(prefix='dbbench-')
+    database_path = os.path.join(directory, 'bench.db')
+
+    # スキーマとユーザーは親プロセスで先に作っておく
+    context = multiprocessing.get_context('spawn')
+    setup = context.Process(target=setup_database, args=(database_path, journal_mode, args.workers))
+    setup.start()
+    setup.join()
+
+    ready, start, results = context.Queue(), context.Event(), context.Queue()
+    processes = [
+        context.Process(target=worker, args=(database_path, journal_mode, i % args.users + 1,
+                                             args.seconds, args.read_ratio, ready, start, results))
+        for i in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.get()
+    start.set()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    writes = sum(result['writes'] for result in collected)
+    latencies = sorted(latency for result in collected for latency in result['latencies'])
+    return {
+        'journal_mode': journal_mode,
+        'workers': args.workers,
+        'seconds': args.seconds,
+        'writes': writes,
+        'reads': sum(result['reads'] for result in collected),
+        'errors': sum(result['errors'] for result in collected),
+        'writes_per_sec': round(writes / args.seconds, 1),
+        'write_p50_ms': round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        'write_p99_ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+    }
+
+
+def setup_database(database_path, journal_mode, users):
+    app_module, app = load_app(database_path, journal_mode)
+    with app.app_context():
+        app_module.init_db()
+        for i in range(users):
+            user = app_module.User(name=f'bench{i}', email=f'bench{i}@example.com')
+            user.set_password('benchmark')
+            app_module.db.session.add(user)
+        app_module.db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--users', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--read-ratio', type=int, default=3, help='書き込み1回あたりの一覧読み込み回数')
+    parser.add_argument('--modes', default='DELETE,WAL', help='比べるジャーナルモード（カンマ区切り）')
+    args = parser.parse_args()
+    args.users = min(args.users, args.workers)
+
+    for journal_mode in args.modes.split(','):
+        print(json.dumps(run(journal_mode.strip().upper(), args)), flush=True)
+
+
+if __name__ == '__main__':
+    main()
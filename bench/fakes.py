@@ -0,0 +1,204 @@
+"""ベンチマーク用の Gemini と OpenWeatherMap の代わり
+
+本物のAPIを呼ばずに負荷をかけられるよう、遅延とエラー率を指定できる偽物を用意する。
+
+    python bench/fakes.py --port 8099 --latency 0.05    # 天気APIのスタブだけを起動する
+    python bench/fakes.py --app-port 5001               # 偽物を使うアプリも起動する（bench/load.py --url 用）
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from PIL import Image
+
+# 解析結果として返す服の候補（種類, 素材, スタイル, 推奨気温）
+ANALYSIS_CATALOG = (
+    ('t-shirt', 'cotton', 'casual', '18-30°C'),
+    ('tank top', 'cotton', 'casual', '24-35°C'),
+    ('shirt', 'linen', 'smart casual', '20-30°C'),
+    ('sweater', 'wool', 'casual', '0-15°C'),
+    ('hoodie', 'cotton', 'street', '8-18°C'),
+    ('jeans', 'denim', 'casual', '5-25°C'),
+    ('chinos', 'cotton', 'smart casual', '10-28°C'),
+    ('shorts', 'cotton', 'casual', '24-35°C'),
+    ('cardigan', 'wool', 'casual', '10-20°C'),
+    ('coat', 'wool', 'formal', '-5-10°C'),
+)
+COLORS = (
+    ('black', '#000000'), ('white', '#ffffff'), ('navy', '#000080'), ('gray', '#808080'),
+    ('beige', '#f5f5dc'), ('red', '#d0021b'), ('olive', '#808000'), ('light blue', '#87ceeb'),
+)
+OUTFIT_SUGGESTION = {
+    'bottoms': [{'item_type': 'Jeans', 'color_name': 'navy'}, {'item_type': 'Chinos', 'color_name': 'beige'}],
+    'jackets': [{'item_type': 'Cardigan', 'color_name': 'gray'}],
+}
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeQuotaError(Exception):
+    # google.api_core の ResourceExhausted と同じくHTTPステータスを code に持つ
+    code = 429
+
+
+class FakeGeminiModel:
+    """gemini_model.generate_content の代わり。latency 秒前後待ってからJSONを返す
+
+    error_rate の割合で429（再試行対象）のエラーを出す。
+    """
+
+    def __init__(self, latency=0.8, jitter=0.2, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def _sample(self):
+        with self.lock:
+            self.calls += 1
+            delay = max(0.0, self.random.gauss(self.latency, self.jitter * self.latency))
+            failed = self.random.random() < self.error_rate
+            return delay, failed, self.random.random()
+
+    def analysis(self, value):
+        item_type, material, style, temp = ANALYSIS_CATALOG[int(value * len(ANALYSIS_CATALOG))]
+        color_name, color_hex = COLORS[int(value * 997) % len(COLORS)]
+        return {
+            'item_type': item_type, 'color_name': color_name, 'color_hex': color_hex, 'pattern': 'solid',
+            'material': material, 'style': style, 'recommended_temp': temp, 'recommended_humidity': '30-70%',
+        }
+
+    def generate_content(self, contents, **kwargs):
+        delay, failed, value = self._sample()
+        time.sleep(delay)
+        if failed:
+            raise FakeQuotaError('429 Resource has been exhausted (e.g. check quota).')
+        if isinstance(contents, str):
+            # 複数日の計画ではトップスの数だけ提案を並べた配列を返す
+            batch = re.search(r'exactly (\d+) objects', contents)
+            data = [OUTFIT_SUGGESTION] * int(batch.group(1)) if batch else OUTFIT_SUGGESTION
+            return FakeResponse('```json\n' + json.dumps(data) + '\n```')
+        images = sum(1 for part in contents if isinstance(part, Image.Image))
+        if 'JSON array' in contents[0]:
+            data = [self.analysis((value + i * 0.37) % 1.0) for i in range(images)]
+        else:
+            data = self.analysis(value)
+        return FakeResponse('```json\n' + json.dumps(data) + '\n```')
+
+
+def isolate_storage(app, directory=None):
+    # アップロードされた画像をリポジトリの static ではなく一時ディレクトリに保存させる
+    directory = directory or tempfile.mkdtemp(prefix='bench-static-')
+    app.static_folder = directory
+    app.config['INGEST_PENDING_FOLDER'] = os.path.join(directory, 'pending')
+    os.makedirs(app.config['INGEST_PENDING_FOLDER'], exist_ok=True)
+    return directory
+
+
+def install_fake_gemini(app, **options):
+    # create_app() で作ったアプリの Geminiクライアントが呼ぶモデルを差し替える（SDKは読み込まれない）
+    model = FakeGeminiModel(**options)
+    app.extensions['gemini'].model = model
+    return model
+
+
+class WeatherStubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        with server.lock:
+            server.requests += 1
+            failed = server.random.random() < server.error_rate
+        time.sleep(server.latency)
+        if failed or not url.path.endswith(('/weather', '/forecast')):
+            self.send_response(503 if failed else 404)
+            self.end_headers()
+            return
+        try:
+            lat = float(query['lat'][0])
+        except (KeyError, ValueError):
+            self.send_response(400)
+            self.end_headers()
+            return
+        # 緯度が高いほど寒くなるだけの単純な天気。予報は5日間・3時間ごとで、日ごとに1.5°C下がる
+        temp = round(30.0 - abs(lat) * 0.5, 1)
+        if url.path.endswith('/forecast'):
+            now = int(time.time()) // 10800 * 10800
+            data = {'city': {'timezone': 0}, 'list': [
+                {'dt': now + i * 10800, 'main': {'temp': round(temp - i * 0.1875, 1), 'humidity': 60}}
+                for i in range(40)
+            ]}
+        else:
+            data = {'main': {'temp': temp, 'humidity': 60}}
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_weather_stub(port=0, latency=0.05, error_rate=0.0, seed=0):
+    # バックグラウンドのスレッドで天気APIのスタブを起動して (server, ベースURL) を返す
+    server = ThreadingHTTPServer(('127.0.0.1', port), WeatherStubHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.error_rate = error_rate
+    server.random = random.Random(seed)
+    server.lock = threading.Lock()
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='天気APIのスタブ（と偽物を使うアプリ）を起動する')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--app-port', type=int, help='指定するとアプリもこのポートで起動する')
+    parser.add_argument('--gemini-latency', type=float, default=0.8)
+    parser.add_argument('--gemini-error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    server, url = start_weather_stub(args.port, args.latency, args.error_rate)
+    print(f'Weather stub listening on {url} (set OPENWEATHER_URL={url})', flush=True)
+    if args.app_port:
+        # DATABASE_URL は bench/load.py --url と同じものを指定する
+        os.environ['OPENWEATHER_URL'] = url
+        os.environ['OPENWEATHER_API_KEY'] = 'benchmark'
+        os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        import app as app_module
+        app = app_module.create_app()
+        with app.app_context():
+            app_module.init_db()
+        isolate_storage(app)
+        install_fake_gemini(app, latency=args.gemini_latency, error_rate=args.gemini_error_rate)
+        app.run(port=args.app_port, threaded=True)
+        return
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
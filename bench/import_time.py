@@ -0,0 +1,138 @@
+"""app の起動にかかる時間（import・create_app()・最初のリクエスト）を測るベンチマーク
+
+    python bench/import_time.py --runs 10 --output startup.json
+
+毎回新しいPythonプロセスで app を読み込み、import app、create_app()、Geminiを使わないルート
+（/metrics と GET /api/clothes）への最初のリクエストの時間と、その時点で読み込まれていた
+重いモジュールを記録する。--top を指定すると -X importtime で累積時間の長いモジュールも出す。
+出力するJSONには段階ごとの時間の最小・中央値・最大と、読み込まれていた重いモジュールの一覧が入る。
+重いモジュールが空でなくなったら、どこかで遅延読み込みが崩れている。
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from common import git_commit  # noqa: E402
+
+# 起動時に読み込まれていないことを確かめるモジュール
+HEAVY_MODULES = ('google.generativeai', 'google.api_core', 'grpc', 'google.protobuf', 'PIL.Image', 'numpy', 'requests')
+PHASES = ('import', 'create_app', 'first_request')
+
+
+def measure_once():
+    # 子プロセスで1回分を測り、JSONを1行出力する
+    started = time.perf_counter()
+    import app as app_module
+    imported = time.perf_counter()
+    app = app_module.create_app()
+    created = time.perf_counter()
+    with app.app_context():
+        app_module.init_db()
+        user = app_module.User(name='bench', email='bench@example.com', password_hash='-')
+        app_module.db.session.add(user)
+        app_module.db.session.commit()
+        token = app_module.create_access_token(identity=str(user.id))
+    client = app.test_client()
+    loaded_after_create = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    requested = time.perf_counter()
+    statuses = [
+        client.get('/metrics').status_code,
+        client.get('/api/clothes', headers={'Authorization': f'Bearer {token}'}).status_code,
+    ]
+    finished = time.perf_counter()
+    print(json.dumps({
+        'import': imported - started,
+        'create_app': created - imported,
+        'first_request': finished - requested,
+        'statuses': statuses,
+        'loaded_after_create_app': loaded_after_create,
+        'loaded_after_requests': [name for name in HEAVY_MODULES if name in sys.modules],
+    }))
+
+
+def child_env(database_path):
+    env = dict(os.environ)
+    env['DATABASE_URL'] = 'sqlite:///' + database_path
+    env['INGEST_RESUME_ON_START'] = '0'
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    env.setdefault('GEMINI_API_KEY', 'benchmark')
+    return env
+
+
+def run_child(directory, index):
+    database_path = os.path.join(directory, f'startup-{index}.db')
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), '--child'], cwd=ROOT,
+                            env=child_env(database_path), capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def import_profile(directory, top):
+    # python -X importtime -c "import app" の累積時間（マイクロ秒）の上位
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=ROOT,
+                            env=child_env(os.path.join(directory, 'importtime.db')),
+                            capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)', line)
+        if match:
+            rows.append({'module': match.group(4), 'self_us': int(match.group(1)),
+                         'cumulative_us': int(match.group(2)), 'depth': len(match.group(3)) // 2})
+    rows.sort(key=lambda row: row['cumulative_us'], reverse=True)
+    return rows[:top]
+
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        'min_ms': round(values[0] * 1000, 2),
+        'median_ms': round(statistics.median(values) * 1000, 2),
+        'max_ms': round(values[-1] * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=0, help='-X importtime の上位何件を出すか（0で出さない）')
+    parser.add_argument('--output', help='結果のJSONを書き出すファイル')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        measure_once()
+        return
+
+    directory = tempfile.mkdtemp(prefix='startupbench-')
+    runs = [run_child(directory, i) for i in range(args.runs)]
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'config': {'runs': args.runs, 'python': sys.version.split()[0]},
+        'results': {phase: summarize([run[phase] for run in runs]) for phase in PHASES},
+        'total': summarize([sum(run[phase] for phase in PHASES) for run in runs]),
+        'statuses': runs[-1]['statuses'],
+        'loaded_after_create_app': runs[-1]['loaded_after_create_app'],
+        'loaded_after_requests': runs[-1]['loaded_after_requests'],
+    }
+    if args.top:
+        report['import_profile'] = import_profile(directory, args.top)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
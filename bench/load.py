@@ -0,0 +1,201 @@
+"""エンドポイントごとの p50/p95/p99 レイテンシと毎秒リクエスト数を測る負荷ドライバ
+
+    python bench/load.py --items 10,1000,10000 --concurrency 8 --seconds 10 --output result.json
+
+一時ファイルのDBに bench/seed.py でデータを作り、Gemini と天気APIを bench/fakes.py の
+偽物に差し替えたアプリをプロセス内（Flaskのテストクライアント）で叩く。
+--url を指定すると起動済みのサーバーを叩く（その場合はサーバー側で偽物を使うこと）。
+出力するJSONには実行したコミット、設定（服の枚数・並列数・偽物の遅延とエラー率）と
+エンドポイントごとの結果が入る。同じ --items と --seed で実行すれば前後の変更で比べられる。
+Gemini の呼び出しはアプリの GEMINI_RATE_PER_MINUTE などの制限を受ける（環境変数で変えられる）。
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import fakes  # noqa: E402
+from common import git_commit, percentile  # noqa: E402
+import seed as seeding  # noqa: E402
+
+ENDPOINTS = ('clothes', 'clothes_page', 'outfit', 'plan', 'register')
+
+
+def summarize(samples, seconds):
+    latencies = sorted(latency for latency, ok in samples)
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'rps': round(len(samples) / seconds, 2),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+    }
+
+
+def random_image(rng):
+    # 解析キャッシュに当たらないよう毎回違う画像を作る
+    from PIL import Image
+    image = Image.new('RGB', (256, 256), tuple(rng.randrange(256) for _ in range(3)))
+    image.putpixel((rng.randrange(256), rng.randrange(256)), (rng.randrange(256), 0, 0))
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+class InProcessClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, headers, files=None):
+        data = {'file': (io.BytesIO(files[1]), files[0])} if files else None
+        response = self.client.open(path, method=method, headers=headers, data=data)
+        return response.status_code
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        import requests
+        self.session = requests.Session()
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, headers, files=None):
+        response = self.session.request(method, self.base_url + path, headers=headers,
+                                        files={'file': files} if files else None, timeout=60)
+        return response.status_code
+
+
+def build_request(endpoint, rng, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    if endpoint == 'clothes':
+        return 'GET', '/api/clothes', headers, None
+    if endpoint == 'clothes_page':
+        return 'GET', '/api/clothes?limit=50&fields=id,item_type,color_name,thumbnail_path', headers, None
+    if endpoint == 'outfit':
+        lat, lon = rng.uniform(-60, 60), rng.uniform(-180, 180)
+        return 'GET', f'/api/outfit?lat={lat:.3f}&lon={lon:.3f}', headers, None
+    if endpoint == 'plan':
+        lat, lon = rng.uniform(-60, 60), rng.uniform(-180, 180)
+        return 'GET', f'/api/outfit/plan?lat={lat:.3f}&lon={lon:.3f}&days=7', headers, None
+    if endpoint == 'register':
+        return 'POST', '/api/clothes', headers, ('bench.jpg', random_image(rng))
+    raise ValueError(f'Unknown endpoint: {endpoint}')
+
+
+def run_endpoint(endpoint, make_client, tokens, args):
+    samples = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def worker(index):
+        rng = random.Random(args.seed * 1000 + index)
+        client = make_client()
+        local = []
+        while time.perf_counter() < deadline:
+            method, path, headers, files = build_request(endpoint, rng, rng.choice(tokens))
+            started = time.perf_counter()
+            try:
+                status = client.request(method, path, headers, files)
+                ok = status < 400
+            except Exception:
+                ok = False
+            local.append((time.perf_counter() - started, ok))
+        with lock:
+            samples.extend(local)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(samples, time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--endpoints', default='clothes,clothes_page,outfit,plan,register')
+    parser.add_argument('--items', type=seeding.parse_items, default=[10, 1000, 10000],
+                        help='ユーザーごとの服の枚数（カンマ区切り、ユーザーごと）')
+    parser.add_argument('--users', type=int, default=None, help='省略時は --items の個数')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10.0, help='エンドポイントごとの計測時間')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--gemini-latency', type=float, default=0.8)
+    parser.add_argument('--gemini-error-rate', type=float, default=0.0)
+    parser.add_argument('--weather-latency', type=float, default=0.05)
+    parser.add_argument('--weather-error-rate', type=float, default=0.0)
+    parser.add_argument('--url', help='起動済みのサーバーを叩く（例: http://127.0.0.1:5001）')
+    parser.add_argument('--output', help='結果のJSONを書き出すファイル')
+    args = parser.parse_args()
+    endpoints = [name.strip() for name in args.endpoints.split(',') if name.strip()]
+    unknown = [name for name in endpoints if name not in ENDPOINTS]
+    if unknown:
+        parser.error(f'Unknown endpoints: {unknown} (choose from {ENDPOINTS})')
+
+    weather_server = None
+    if args.url is None:
+        # create_app() は環境変数から設定を読むので、アプリを作る前に設定する
+        weather_server, weather_url = fakes.start_weather_stub(latency=args.weather_latency,
+                                                               error_rate=args.weather_error_rate, seed=args.seed)
+        os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='loadbench-'), 'bench.db'))
+        os.environ['OPENWEATHER_URL'] = weather_url
+        os.environ['OPENWEATHER_API_KEY'] = 'benchmark'
+        os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+    sys.path.insert(0, ROOT)
+    import app as app_module
+    # テスト用のDB以外のジョブを取らないよう、未完了のジョブの再開はしない
+    app = app_module.create_app({'INGEST_RESUME_ON_START': False})
+
+    users = args.users or len(args.items)
+    with app.app_context():
+        app_module.init_db()
+        seeded = seeding.seed(app_module, users, args.items, args.seed)
+        tokens = [app_module.create_access_token(identity=str(user_id)) for user_id, _, _ in seeded]
+
+    if args.url is None:
+        fakes.isolate_storage(app)
+        fakes.install_fake_gemini(app, latency=args.gemini_latency,
+                                  error_rate=args.gemini_error_rate, seed=args.seed)
+        make_client = lambda: InProcessClient(app)  # noqa: E731
+    else:
+        make_client = lambda: HttpClient(args.url)  # noqa: E731
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'config': {
+            'target': args.url or 'in-process',
+            'users': users, 'items': args.items, 'concurrency': args.concurrency,
+            'seconds': args.seconds, 'seed': args.seed,
+            'gemini_latency': args.gemini_latency, 'gemini_error_rate': args.gemini_error_rate,
+            'weather_latency': args.weather_latency, 'weather_error_rate': args.weather_error_rate,
+        },
+        'results': {},
+    }
+    for endpoint in endpoints:
+        report['results'][endpoint] = run_endpoint(endpoint, make_client, tokens, args)
+        print(json.dumps({'endpoint': endpoint, **report['results'][endpoint]}), file=sys.stderr, flush=True)
+
+    if weather_server is not None:
+        weather_server.shutdown()
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""ログインの毎秒リクエスト数（CPUコアあたり）と、ログインが集中している間の他のリクエストの遅延を測る
+
+    python bench/login_bench.py --workers 0,2 --concurrency 8 --seconds 10 --output login.json
+
+--workers はパスワードのハッシュ化に使うプロセス数。0 はリクエストのスレッドで計算する（以前の動作）。
+ログインを concurrency 本のスレッドで繰り返しながら、別のスレッドで服一覧API（GET /api/clothes）を
+叩いて遅延を測る。コアあたりの値は、このプロセスとハッシュ化のプロセスが使ったCPU時間で割ったもの。
+出力するJSONにはプロセス数ごとに、ログイン数・429で断った数・CPU時間と、服一覧APIの p50/p99 が入る。
+プロセス数を増やしても服一覧APIの遅延が縮まらなければ、ハッシュ化がまだリクエストのスレッドを止めている。
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from common import git_commit, percentile  # noqa: E402
+
+
+def cpu_seconds():
+    # このプロセスと、終了済みの子プロセス（ハッシュ化のプロセス）のCPU時間の合計
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def seed_users(app_module, users, password):
+    db, User = app_module.db, app_module.User
+    created = []
+    for i in range(users):
+        email = f'login-{i}@example.com'
+        user = User.query.filter_by(email=email).first()
+        if user is None:
+            user = User(name=f'login{i}', email=email)
+            user.set_password(password)
+            db.session.add(user)
+            db.session.commit()
+        created.append((user.id, email))
+    return created
+
+
+def run_config(app_module, workers, args):
+    app = app_module.create_app({'PASSWORD_HASH_WORKERS': workers,
+                                 'PASSWORD_HASH_MAX_PENDING': args.max_pending})
+    with app.app_context():
+        users = seed_users(app_module, args.users, args.password)
+        token = app_module.create_access_token(identity=str(users[0][0]))
+    hasher = app.extensions['password_hasher']
+    # ハッシュ化のプロセスの起動時間を含めないよう1回ログインしておく
+    app.test_client().post('/api/login', json={'email': users[0][1], 'password': args.password})
+
+    statuses = {}
+    probe_latencies = []
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def login_worker(index):
+        rng = random.Random(args.seed * 1000 + index)
+        client = app.test_client()
+        local = {}
+        while not stop.is_set():
+            _, email = rng.choice(users)
+            status = client.post('/api/login', json={'email': email, 'password': args.password}).status_code
+            local[status] = local.get(status, 0) + 1
+        with lock:
+            for status, count in local.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    def probe_worker():
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {token}'}
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.get('/api/clothes?limit=1', headers=headers)
+            probe_latencies.append(time.perf_counter() - started)
+            time.sleep(args.probe_interval)
+
+    threads = [threading.Thread(target=login_worker, args=(i,)) for i in range(args.concurrency)]
+    threads.append(threading.Thread(target=probe_worker))
+    cpu_started, started = cpu_seconds(), time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    # ハッシュ化のプロセスを終了させてCPU時間を回収する
+    hasher.shutdown()
+    cpu_used = cpu_seconds() - cpu_started
+
+    logins = statuses.get(200, 0)
+    probe_latencies.sort()
+    return {
+        'workers': workers,
+        'logins': logins,
+        'rejected_429': statuses.get(429, 0),
+        'errors': sum(count for status, count in statuses.items() if status not in (200, 429)),
+        'logins_per_sec': round(logins / elapsed, 2),
+        'cpu_seconds': round(cpu_used, 2),
+        'logins_per_cpu_sec': round(logins / cpu_used, 2) if cpu_used else None,
+        'probe_requests': len(probe_latencies),
+        'probe_p50_ms': round(percentile(probe_latencies, 0.50) * 1000, 2) if probe_latencies else None,
+        'probe_p99_ms': round(percentile(probe_latencies, 0.99) * 1000, 2) if probe_latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', default='0,2', help='比べるハッシュ化のプロセス数（カンマ区切り）')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10.0, help='設定ごとの計測時間')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--max-pending', type=int, default=32)
+    parser.add_argument('--probe-interval', type=float, default=0.01)
+    parser.add_argument('--password', default='benchmark-password')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='結果のJSONを書き出すファイル')
+    args = parser.parse_args()
+
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='loginbench-'), 'bench.db'))
+    os.environ['INGEST_RESUME_ON_START'] = '0'
+    sys.path.insert(0, ROOT)
+    import app as app_module
+    with app_module.create_app({'PASSWORD_HASH_WORKERS': 0}).app_context():
+        app_module.init_db()
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'config': {
+            'cpu_count': os.cpu_count(), 'concurrency': args.concurrency, 'seconds': args.seconds,
+            'users': args.users, 'max_pending': args.max_pending, 'seed': args.seed,
+        },
+        'results': [],
+    }
+    for workers in (int(value) for value in args.workers.split(',') if value.strip()):
+        result = run_config(app_module, workers, args)
+        report['results'].append(result)
+        print(json.dumps(result), file=sys.stderr, flush=True)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
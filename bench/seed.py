@@ -0,0 +1,111 @@
+"""ベンチマーク用のユーザーと服を乱数の種を固定して作る
+
+    DATABASE_URL=sqlite:////tmp/bench.db python bench/seed.py --users 10 --items 10,100,1000,10000
+
+--items はユーザーごとの服の枚数。ユーザー数より少なければ最後の値を繰り返す。
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (種類, 素材, スタイル, 推奨気温の範囲の中心と幅)
+CATALOG = (
+    ('t-shirt', 'cotton', 'casual', 24, 12), ('tank top', 'cotton', 'casual', 29, 10),
+    ('shirt', 'linen', 'smart casual', 24, 10), ('blouse', 'silk', 'smart', 22, 10),
+    ('polo', 'cotton', 'smart casual', 23, 10), ('sweater', 'wool', 'casual', 8, 14),
+    ('hoodie', 'cotton', 'street', 13, 10), ('jeans', 'denim', 'casual', 15, 20),
+    ('chinos', 'cotton', 'smart casual', 19, 18), ('shorts', 'cotton', 'casual', 29, 10),
+    ('skirt', 'polyester', 'casual', 23, 12), ('slacks', 'wool', 'formal', 15, 18),
+    ('cardigan', 'wool', 'casual', 15, 10), ('jacket', 'polyester', 'casual', 12, 12),
+    ('coat', 'wool', 'formal', 3, 14), ('blazer', 'wool', 'formal', 16, 10),
+)
+COLORS = (
+    ('black', '#000000'), ('white', '#ffffff'), ('navy', '#000080'), ('gray', '#808080'),
+    ('charcoal', '#36454f'), ('beige', '#f5f5dc'), ('khaki', '#c3b091'), ('brown', '#8b4513'),
+    ('olive', '#808000'), ('green', '#228b22'), ('light blue', '#87ceeb'), ('blue', '#1f4fbf'),
+    ('red', '#d0021b'), ('burgundy', '#800020'), ('pink', '#ffc0cb'), ('mustard', '#e1ad01'),
+)
+PATTERNS = ('solid', 'solid', 'solid', 'striped', 'checked', 'printed')
+PLACEHOLDER_IMAGE = 'uploads/bench/placeholder.jpg'
+
+
+def generate_clothes(rng, count):
+    # 服の属性の辞書を count 個作る
+    for _ in range(count):
+        item_type, material, style, center, width = rng.choice(CATALOG)
+        color_name, color_hex = rng.choice(COLORS)
+        low = center - width / 2 + rng.randint(-3, 3)
+        humidity_low = rng.choice((20, 30, 40))
+        yield {
+            'image_path': PLACEHOLDER_IMAGE,
+            'item_type': item_type,
+            'color_name': color_name,
+            'color_hex': color_hex,
+            'pattern': rng.choice(PATTERNS),
+            'material': material,
+            'style': style,
+            'recommended_temp': f'{int(low)}-{int(low + width)}°C',
+            'recommended_humidity': f'{humidity_low}-{humidity_low + 40}%',
+        }
+
+
+def seed(app_module, users, items, seed=0, password='benchmark'):
+    """ユーザーを作って服をまとめて登録し、[(user_id, email, 服の枚数)] を返す
+
+    app_module は読み込み済みの app モジュール（アプリケーションコンテキストの中で呼ぶ）。
+    """
+    db, User, Cloth = app_module.db, app_module.User, app_module.Cloth
+    rng = random.Random(seed)
+    # パスワードのハッシュ化は遅いので全員で同じハッシュを使う
+    template = User(name='bench', email='bench@example.com')
+    template.set_password(password)
+
+    created = []
+    for i in range(users):
+        count = items[min(i, len(items) - 1)]
+        email = f'bench-{seed}-{i}@example.com'
+        user = User.query.filter_by(email=email).first()
+        if user is None:
+            user = User(name=f'bench{i}', email=email, password_hash=template.password_hash)
+            db.session.add(user)
+            db.session.flush()
+        rows = []
+        for attributes in generate_clothes(rng, count):
+            cloth = app_module.apply_ranges(Cloth(user_id=user.id, **attributes))
+            rows.append({column.key: getattr(cloth, column.key)
+                         for column in Cloth.__table__.columns if column.key != 'id'})
+        for start in range(0, len(rows), 1000):
+            db.session.execute(db.insert(Cloth), rows[start:start + 1000])
+        app_module.bump_wardrobe_version(user.id)
+        db.session.commit()
+        created.append((user.id, email, count))
+    return created
+
+
+def parse_items(text):
+    return [int(value) for value in text.split(',') if value.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=4)
+    parser.add_argument('--items', type=parse_items, default=[10, 100, 1000, 10000])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    import app as app_module
+    # データを入れるだけなので、パスワードのハッシュ化にプロセスプールを使わない
+    app = app_module.create_app({'PASSWORD_HASH_WORKERS': 0})
+    with app.app_context():
+        app_module.init_db()
+        for user_id, email, count in seed(app_module, args.users, args.items, args.seed):
+            print(json.dumps({'user_id': user_id, 'email': email, 'items': count}))
+
+
+if __name__ == '__main__':
+    main()
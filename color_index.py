@@ -0,0 +1,135 @@
+# ---------------- 色空間での最近傍検索 ----------------
+# color_hex をCIELABに変換してユーザーごとに配列で持ち、Geminiが提案した
+# 「navy jeans」のような服を、同じ役割（ボトムス・アウター）と種類で色が一番近い手持ちの服に対応づける
+import copy
+import re
+
+import numpy as np
+
+from outfit_scorer import categorize
+
+# nearest() の role と categorize() の結果の位置
+ROLES = ('top', 'bottom', 'jacket')
+
+# 色名 -> 代表色（Geminiの提案やcolor_nameによく出てくるもの）
+NAMED_COLORS = {
+    'black': '#000000', 'white': '#ffffff', 'gray': '#808080', 'grey': '#808080',
+    'charcoal': '#36454f', 'silver': '#c0c0c0', 'ivory': '#fffff0', 'cream': '#fffdd0',
+    'beige': '#f5f5dc', 'khaki': '#c3b091', 'tan': '#d2b48c', 'camel': '#c19a6b',
+    'brown': '#8b4513', 'chocolate': '#7b3f00', 'olive': '#808000', 'green': '#228b22',
+    'forest': '#228b22', 'mint': '#98ff98', 'teal': '#008080', 'turquoise': '#40e0d0',
+    'navy': '#000080', 'blue': '#1f4fbf', 'indigo': '#3f2a78', 'denim': '#1560bd',
+    'sky': '#87ceeb', 'purple': '#800080', 'lavender': '#b57edc', 'violet': '#8f00ff',
+    'pink': '#ffc0cb', 'red': '#d0021b', 'burgundy': '#800020', 'maroon': '#800000',
+    'wine': '#722f37', 'orange': '#ff8c00', 'coral': '#ff7f50', 'yellow': '#ffd700',
+    'mustard': '#e1ad01', 'gold': '#d4af37',
+}
+# 「light blue」「dark green」などの修飾語による明度の補正
+LIGHTNESS_MODIFIERS = {'light': 20.0, 'pale': 20.0, 'washed': 12.0, 'dark': -20.0, 'deep': -15.0}
+
+_WHITE_POINT = np.array([0.95047, 1.0, 1.08883])
+
+_RGB_TO_XYZ = np.array([
+    [0.4124, 0.3576, 0.1805],
+    [0.2126, 0.7152, 0.0722],
+    [0.0193, 0.1192, 0.9505],
+])
+
+def _hex_to_rgb(color_hex):
+    try:
+        value = color_hex.strip().lstrip('#')
+        return [int(value[i:i + 2], 16) / 255.0 for i in (0, 2, 4)]
+    except (AttributeError, ValueError, IndexError):
+        return [np.nan] * 3
+
+def hexes_to_lab(color_hexes):
+    # '#RRGGBB' のリストを (N, 3) のCIELAB (L, a, b) にまとめて変換する。不正な値の行はNaN
+    rgb = np.array([_hex_to_rgb(color_hex) for color_hex in color_hexes], dtype=float).reshape(-1, 3)
+    linear = np.where(rgb > 0.04045, ((rgb + 0.055) / 1.055) ** 2.4, rgb / 12.92)
+    xyz = linear @ _RGB_TO_XYZ.T / _WHITE_POINT
+    f = np.where(xyz > 0.008856, np.cbrt(xyz), 7.787 * xyz + 16.0 / 116.0)
+    return np.stack([116.0 * f[:, 1] - 16.0, 500.0 * (f[:, 0] - f[:, 1]), 200.0 * (f[:, 1] - f[:, 2])], axis=1)
+
+def hex_to_lab(color_hex):
+    # '#RRGGBB' をCIELAB (L, a, b) に変換する。不正な値はNaN
+    return hexes_to_lab([color_hex])[0]
+
+def name_to_lab(color_name):
+    # 色名をCIELABに変換する。知らない色名ならNone
+    words = re.findall(r'[a-z]+', (color_name or '').lower())
+    base = next((NAMED_COLORS[word] for word in reversed(words) if word in NAMED_COLORS), None)
+    if base is None:
+        return None
+    lab = hex_to_lab(base)
+    lab[0] = min(100.0, max(0.0, lab[0] + sum(LIGHTNESS_MODIFIERS.get(word, 0.0) for word in words)))
+    return lab
+
+def _singular(word):
+    # 「jeans」->「jean」、「dresses」「dress」->「dress」
+    if word.endswith('sses'):
+        return word.removesuffix('es')
+    if word.endswith('ss'):
+        return word
+    return word.removesuffix('s')
+
+def normalize_type(item_type):
+    # 種類を (単語を空白でつないだもの, 最後の単語) にする。「T-shirt」は1語のまま扱い、
+    # 「Jeans」と「jean」が一致するよう単数形にそろえる
+    words = [_singular(word) for word in re.findall(r'[a-z]+(?:-[a-z]+)*', (item_type or '').lower())]
+    if not words:
+        return None, None
+    return ' '.join(words), words[-1]
+
+class ColorIndex:
+    # ユーザーの服の種類・役割と色（CIELAB）を配列で持つ。entries は [(Cloth.to_dict() の結果, color_hex)]
+    def __init__(self, entries, top_types=()):
+        self.top_types = top_types
+        self.items = [item for item, _ in entries]
+        self.types, self.head_nouns = [], []
+        for item in self.items:
+            full_type, head_noun = normalize_type(item['item_type'])
+            self.types.append(full_type)
+            self.head_nouns.append(head_noun)
+        self.roles = np.array([categorize(item['item_type'], top_types) for item in self.items],
+                              dtype=bool).reshape(-1, len(ROLES))
+        self.lab = hexes_to_lab([color_hex for _, color_hex in entries])
+
+    def __len__(self):
+        return len(self.items)
+
+    def updated(self, entries, removed_ids=()):
+        # entries の服を足し、removed_ids の服を除いたインデックスを返す。残りの服は変換し直さない
+        added = ColorIndex(entries, self.top_types)
+        keep = np.array([i for i, item in enumerate(self.items) if item['id'] not in removed_ids], dtype=np.intp)
+        index = copy.copy(self)
+        index.items = [self.items[i] for i in keep] + added.items
+        index.types = [self.types[i] for i in keep] + added.types
+        index.head_nouns = [self.head_nouns[i] for i in keep] + added.head_nouns
+        index.roles = np.concatenate([self.roles[keep], added.roles])
+        index.lab = np.concatenate([self.lab[keep], added.lab])
+        return index
+
+    def nearest(self, item_type, color_name, max_distance, role=None):
+        # 役割（'top'・'bottom'・'jacket'）が合う服のうち、種類が同じもの、なければ最後の単語
+        # （「track jacket」なら jacket）が同じものから色が最も近いものを返す。色名が分からなければ最初の1着
+        wanted_type, wanted_head = normalize_type(item_type)
+        if wanted_type is None:
+            return None
+        fits_role = self.roles[:, ROLES.index(role)] if role else np.ones(len(self.items), dtype=bool)
+        candidates = fits_role & np.array([full_type == wanted_type for full_type in self.types], dtype=bool)
+        if not candidates.any():
+            candidates = fits_role & np.array([head == wanted_head for head in self.head_nouns], dtype=bool)
+        if not candidates.any():
+            return None
+        target = name_to_lab(color_name)
+        if target is None:
+            return self.items[int(np.flatnonzero(candidates)[0])]
+
+        distance = np.sqrt(((self.lab - target) ** 2).sum(axis=1))
+        # 色が不明な服は候補の最後に回す
+        distance = np.where(np.isnan(distance), max_distance, distance)
+        distance = np.where(candidates, distance, np.inf)
+        best = int(np.argmin(distance))
+        if distance[best] > max_distance:
+            return None
+        return self.items[best]
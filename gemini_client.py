@@ -0,0 +1,275 @@
+# ---------------- Gemini APIクライアント ----------------
+# モデル呼び出しをまとめて、レート制限（トークンバケット）・同時実行数の上限・
+# 再試行（ジッター付き指数バックオフ）・サーキットブレーカーをかける。
+# 上流の障害時に再試行が積み重なって応答が伸び続けないようにするためのもの
+import functools
+import json
+import random
+import threading
+import time
+
+# 例外クラスで判定できないときに、例外が持つHTTPステータスで再試行可能か判定する
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class GeminiError(Exception):
+    pass
+
+class GeminiUnavailable(GeminiError):
+    # 上限・ブレーカー・再試行切れで呼び出せなかった（しばらくしてから再試行できる）
+    pass
+
+class GeminiResponseError(GeminiError):
+    # レスポンスが期待したJSONではなかった
+    def __init__(self, message, text):
+        super().__init__(message)
+        self.text = text
+
+
+@functools.cache
+def retryable_exceptions():
+    # 通信の失敗と、上流の障害を表す google.api_core・requests の例外。
+    # google.api_core は grpc・protobuf まで読み込んで重いので、最初に例外を判定するときに読み込む
+    # （例外が出た時点でSDKは読み込まれている）
+    exceptions = [ConnectionError, TimeoutError]
+    try:
+        from google.api_core import exceptions as google_exceptions
+        exceptions += [
+            google_exceptions.TooManyRequests,
+            google_exceptions.ResourceExhausted,
+            google_exceptions.ServiceUnavailable,
+            google_exceptions.InternalServerError,
+            google_exceptions.DeadlineExceeded,
+        ]
+    except ImportError:
+        pass
+    try:
+        import requests
+        exceptions += [requests.exceptions.ConnectionError, requests.exceptions.Timeout]
+    except ImportError:
+        pass
+    return tuple(exceptions)
+
+def status_code_of(error):
+    # google.api_core の例外や urllib の HTTPError は code、requests の HTTPError は response.status_code
+    for value in (getattr(error, 'code', None), getattr(getattr(error, 'response', None), 'status_code', None)):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    return None
+
+def is_retryable(error):
+    # メッセージの文字列では判定しない（「5000px」や「connection_id」のような入力のエラーを再試行しない）
+    if isinstance(error, retryable_exceptions()):
+        return True
+    return status_code_of(error) in RETRYABLE_STATUS_CODES
+
+def extract_json(text):
+    # レスポンスの本文からJSONを取り出す。```json ... ``` のコードブロック記法を除去する
+    response_text = (text or '').strip()
+    if response_text.startswith('```'):
+        response_text = response_text[3:]
+        if response_text.lower().startswith('json'):
+            response_text = response_text[4:]
+    if response_text.endswith('```'):
+        response_text = response_text[:-3]
+    response_text = response_text.strip()
+    try:
+        return json.loads(response_text)
+    except json.JSONDecodeError as e:
+        raise GeminiResponseError(f'Gemini response is not valid JSON: {e}', text) from e
+
+
+class TokenBucket:
+    # 1分あたり rate_per_minute 回、最大 burst 回まで連続で呼べる
+    def __init__(self, rate_per_minute, burst):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, timeout):
+        # トークンを1つ取る。timeout 秒以内に取れなければ False
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return True
+                wait = (1.0 - self.tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    # 連続して failure_threshold 回失敗したら reset_timeout 秒の間は呼び出しを止める。
+    # その後は1回だけ試し（half-open）、成功すれば元に戻す
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return 'closed'
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return 'open'
+            return 'half_open'
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self.trial_running:
+                return False
+            self.trial_running = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def release_trial(self):
+        # 試行枠を取ったが呼び出さなかったとき
+        with self.lock:
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.trial_running = False
+
+
+class GeminiClient:
+    def __init__(self, model=None, rate_per_minute=60, burst=10, max_concurrency=8, max_retries=3,
+                 backoff_base=0.5, backoff_max=8.0, breaker_threshold=5, breaker_reset=30.0,
+                 acquire_timeout=10.0, model_loader=None):
+        # model を渡さずに model_loader を渡すと、最初の呼び出しでモデルを作る（SDKの読み込みを遅らせる）
+        self._model = model
+        self.model_loader = model_loader
+        self.model_lock = threading.Lock()
+        self.bucket = TokenBucket(rate_per_minute, burst)
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.acquire_timeout = acquire_timeout
+        self.stats_lock = threading.Lock()
+        self.counters = {
+            'calls': 0, 'attempts': 0, 'successes': 0, 'failures': 0, 'retries': 0,
+            'rejected_breaker': 0, 'rejected_rate_limit': 0, 'rejected_concurrency': 0,
+            'latency_total_ms': 0.0, 'latency_max_ms': 0.0,
+            'prompt_tokens': 0, 'output_tokens': 0,
+        }
+        self.error_classes = {} # 例外クラス名 -> 回数（試行ごと）
+
+    @property
+    def model(self):
+        if self._model is None and self.model_loader is not None:
+            with self.model_lock:
+                if self._model is None:
+                    self._model = self.model_loader()
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+
+    def _count(self, **values):
+        with self.stats_lock:
+            for key, value in values.items():
+                self.counters[key] += value
+
+    def _count_error(self, error):
+        name = type(error).__name__
+        with self.stats_lock:
+            self.error_classes[name] = self.error_classes.get(name, 0) + 1
+
+    def _count_usage(self, response):
+        # レスポンスの usage_metadata からトークン数を数える（ない場合は数えない）
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is not None:
+            self._count(prompt_tokens=getattr(usage, 'prompt_token_count', 0) or 0,
+                        output_tokens=getattr(usage, 'candidates_token_count', 0) or 0)
+
+    def _attempt(self, model, contents):
+        if not self.breaker.allow():
+            self._count(rejected_breaker=1)
+            raise GeminiUnavailable('Gemini API is temporarily unavailable (circuit open)')
+        if not self.bucket.acquire(self.acquire_timeout):
+            # ブレーカーの試行枠を取っていた場合に備えて失敗としては数えずに戻す
+            self.breaker.release_trial()
+            self._count(rejected_rate_limit=1)
+            raise GeminiUnavailable('Gemini API rate limit reached')
+        if not self.semaphore.acquire(timeout=self.acquire_timeout):
+            self.breaker.release_trial()
+            self._count(rejected_concurrency=1)
+            raise GeminiUnavailable('Too many concurrent Gemini API calls')
+        try:
+            self._count(attempts=1)
+            return model.generate_content(contents)
+        finally:
+            self.semaphore.release()
+
+    def generate(self, contents):
+        # モデルを呼び出してレスポンスの本文を返す。再試行可能なエラーはバックオフして再試行する
+        self._count(calls=1)
+        started = time.perf_counter()
+        try:
+            model = self.model
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = self._attempt(model, contents)
+                    self._count_usage(response)
+                    text = response.text
+                except GeminiUnavailable:
+                    raise
+                except Exception as e:
+                    self._count_error(e)
+                    if not is_retryable(e):
+                        # リクエスト側の問題（不正な入力など）は上流の障害として数えない
+                        self.breaker.record_success()
+                        raise
+                    self.breaker.record_failure()
+                    if attempt == self.max_retries:
+                        raise GeminiUnavailable(f'Gemini API error after {attempt + 1} attempts: {e}') from e
+                    self._count(retries=1)
+                    # full jitter: 0 から上限までの一様乱数だけ待つ
+                    time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+                    continue
+                self.breaker.record_success()
+                self._count(successes=1)
+                return text
+        except Exception:
+            self._count(failures=1)
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self.stats_lock:
+                self.counters['latency_total_ms'] += elapsed_ms
+                self.counters['latency_max_ms'] = max(self.counters['latency_max_ms'], elapsed_ms)
+
+    def generate_json(self, contents):
+        return extract_json(self.generate(contents))
+
+    def stats(self):
+        with self.stats_lock:
+            stats = dict(self.counters)
+            stats['errors'] = dict(self.error_classes)
+        stats['latency_avg_ms'] = stats['latency_total_ms'] / stats['calls'] if stats['calls'] else 0.0
+        stats['circuit'] = self.breaker.state
+        return stats
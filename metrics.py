@@ -0,0 +1,220 @@
+# ---------------- メトリクスとトレース ----------------
+# ルートごとのレイテンシ、処理の段階（画像のデコード・モデル呼び出し・天気の取得・DBクエリ・
+# JSONの解析）ごとの時間、Geminiのトークン数やエラーの種類、キャッシュのヒット率を集計して
+# Prometheusのテキスト形式で出力する。遅いリクエストは段階ごとの内訳をログに出し、
+# 一部のリクエストはcProfileでプロファイルする
+import cProfile
+import io
+import logging
+import pstats
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+
+logger = logging.getLogger(__name__)
+
+# レイテンシのバケット（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in list(self.metrics):
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, help, labelnames=(), registry=REGISTRY):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+        registry.register(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def snapshot(self):
+        # {ラベルの値のタプル: 値}
+        with self.lock:
+            return dict(self.values)
+
+    def samples(self):
+        with self.lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            yield self.name, list(zip(self.labelnames, key)), value
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.values = {} # ラベル -> [バケットごとの件数, 合計, 件数]
+        self.lock = threading.Lock()
+        registry.register(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        with self.lock:
+            items = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self.values.items())
+        for key, (counts, total, count) in items:
+            labels = list(zip(self.labelnames, key))
+            for bound, bucket_count in zip(self.buckets, counts):
+                yield f'{self.name}_bucket', labels + [('le', _format_value(float(bound)))], bucket_count
+            yield f'{self.name}_bucket', labels + [('le', '+Inf')], count
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, count
+
+
+class CallbackMetric:
+    # 出力のたびに collect() を呼んで [(ラベルの辞書, 値)] を得る（既存の統計を出すため）
+    def __init__(self, name, help, type, collect, registry=REGISTRY):
+        self.name, self.help, self.type, self.collect = name, help, type, collect
+        registry.register(self)
+
+    def samples(self):
+        try:
+            values = self.collect()
+        except Exception:
+            logger.exception('Failed to collect metric %s', self.name)
+            return
+        for labels, value in values:
+            yield self.name, sorted(labels.items()), value
+
+
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'HTTP request latency by route',
+                            ('method', 'route', 'status'))
+PHASE_LATENCY = Histogram('phase_duration_seconds', 'Time spent in each processing phase', ('phase', 'route'))
+SLOW_REQUESTS = Counter('http_slow_requests_total', 'Requests slower than the slow request threshold', ('route',))
+
+
+@contextmanager
+def span(phase):
+    # 処理の段階の時間を計る。リクエスト中ならリクエストごとの内訳にも足す
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(phase, time.perf_counter() - started)
+
+def record_phase(phase, elapsed):
+    route = ''
+    if has_request_context():
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        spans = g.setdefault('metrics_spans', {})
+        total, count = spans.get(phase, (0.0, 0))
+        spans[phase] = (total + elapsed, count + 1)
+    PHASE_LATENCY.observe(elapsed, phase=phase, route=route)
+
+
+class Instrumentation:
+    """Flaskアプリにリクエストの計測を組み込む
+
+    slow_request_seconds を超えたリクエストは段階ごとの内訳をWARNINGで出す。
+    profile_sample_rate の割合のリクエストをcProfileで計測し、遅かったものの上位の関数を出す。
+    """
+
+    def __init__(self, app, slow_request_seconds=1.0, profile_sample_rate=0.0, profile_top=25):
+        self.slow_request_seconds = slow_request_seconds
+        self.profile_sample_rate = profile_sample_rate
+        self.profile_top = profile_top
+        # cProfileは同時に1つしか有効にできない（Python 3.12以降）ので1リクエストずつ計測する
+        self.profile_lock = threading.Lock()
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+
+    def before_request(self):
+        g.metrics_started = time.perf_counter()
+        g.metrics_spans = {}
+        if self.profile_sample_rate > 0 and random.random() < self.profile_sample_rate \
+                and self.profile_lock.acquire(blocking=False):
+            g.metrics_profiler = cProfile.Profile()
+            g.metrics_profiler.enable()
+
+    def after_request(self, response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_LATENCY.observe(elapsed, method=request.method, route=route, status=response.status_code)
+
+        profiler = self._stop_profiler()
+        if elapsed >= self.slow_request_seconds:
+            SLOW_REQUESTS.inc(route=route)
+            breakdown = ', '.join(f'{phase}={total * 1000:.1f}ms/{count}'
+                                  for phase, (total, count) in sorted(g.get('metrics_spans', {}).items()))
+            logger.warning('Slow request %s %s took %.1fms (%s)', request.method, request.path,
+                           elapsed * 1000, breakdown or 'no spans')
+            if profiler is not None:
+                output = io.StringIO()
+                pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(self.profile_top)
+                logger.warning('Profile of %s %s:\n%s', request.method, request.path, output.getvalue())
+        return response
+
+    def teardown_request(self, error):
+        # after_request まで来なかった（例外が出た）場合もプロファイラを止める
+        self._stop_profiler()
+
+    def _stop_profiler(self):
+        profiler = g.pop('metrics_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            self.profile_lock.release()
+        return profiler
+
+
+def render():
+    return REGISTRY.render()
@@ -0,0 +1,153 @@
+# ---------------- ローカルのコーディネート採点エンジン ----------------
+# ユーザーの服から特徴量の行列を作り、トップス×ボトムス×アウターの全組み合わせを
+# NumPyでまとめて採点する。Geminiを呼ばずにコーディネートを決めるために使う
+import numpy as np
+
+BOTTOM_KEYWORDS = ('jeans', 'pants', 'trousers', 'shorts', 'skirt', 'chinos', 'slacks', 'leggings', 'joggers')
+JACKET_KEYWORDS = ('jacket', 'coat', 'cardigan', 'blazer', 'parka', 'hoodie', 'windbreaker', 'vest')
+
+# スタイルのフォーマル度（該当しなければ0.3）
+FORMALITY_KEYWORDS = (
+    (('formal', 'business', 'dress', 'suit', 'tailored'), 1.0),
+    (('smart', 'office', 'elegant', 'classic'), 0.6),
+    (('casual', 'basic', 'street', 'sport', 'relaxed', 'athletic'), 0.0),
+)
+
+# アウターが必要になる気温（これを下回るとアウターなしは減点）
+JACKET_THRESHOLD = 20.0
+# ボトムスが見つからない組み合わせの減点
+NO_BOTTOM_PENALTY = -3.0
+# 種類ごとに組み合わせに使う候補の上限（気温への合い方で上位を選ぶ）
+MAX_CANDIDATES = 24
+
+def categorize(item_type, top_types):
+    # 服の種類からトップス・ボトムス・アウターのどれに使えるかを返す（複数可）
+    name = (item_type or '').strip().lower()
+    return (
+        name in top_types,
+        any(keyword in name for keyword in BOTTOM_KEYWORDS),
+        any(keyword in name for keyword in JACKET_KEYWORDS),
+    )
+
+def formality(style):
+    text = (style or '').lower()
+    for keywords, value in FORMALITY_KEYWORDS:
+        if any(keyword in text for keyword in keywords):
+            return value
+    return 0.3
+
+def hex_to_hsv(color_hex):
+    # '#RRGGBB' を (色相0-360, 彩度0-1, 明度0-1) に変換する。不正な値はNaN
+    try:
+        value = color_hex.strip().lstrip('#')
+        r, g, b = (int(value[i:i + 2], 16) / 255.0 for i in (0, 2, 4))
+    except (AttributeError, ValueError, IndexError):
+        return (np.nan, np.nan, np.nan)
+    high, low = max(r, g, b), min(r, g, b)
+    delta = high - low
+    if delta == 0:
+        hue = 0.0
+    elif high == r:
+        hue = 60.0 * (((g - b) / delta) % 6)
+    elif high == g:
+        hue = 60.0 * ((b - r) / delta + 2)
+    else:
+        hue = 60.0 * ((r - g) / delta + 4)
+    return (hue, delta / high if high else 0.0, high)
+
+class WardrobeFeatures:
+    # 服のリスト（to_dict()・color_hex・数値範囲）から採点用の配列を作る
+    def __init__(self, clothes, top_types):
+        self.items = [cloth['item'] for cloth in clothes]
+        self.ids = np.array([cloth['item']['id'] for cloth in clothes], dtype=np.int64)
+        categories = np.array([categorize(cloth['item']['item_type'], top_types) for cloth in clothes], dtype=bool).reshape(-1, 3)
+        self.top_idx = np.flatnonzero(categories[:, 0])
+        self.bottom_idx = np.flatnonzero(categories[:, 1])
+        self.jacket_idx = np.flatnonzero(categories[:, 2])
+
+        def column(key):
+            return np.array([np.nan if cloth[key] is None else cloth[key] for cloth in clothes], dtype=float)
+
+        self.temp_min, self.temp_max = column('temp_min'), column('temp_max')
+        self.humidity_min, self.humidity_max = column('humidity_min'), column('humidity_max')
+        hsv = np.array([hex_to_hsv(cloth['color_hex']) for cloth in clothes], dtype=float).reshape(-1, 3)
+        self.hue, self.saturation, self.value = hsv[:, 0], hsv[:, 1], hsv[:, 2]
+        self.formality = np.array([formality(cloth['item']['style']) for cloth in clothes], dtype=float)
+        self.denim = np.array(['denim' in (cloth['item']['material'] or '').lower() for cloth in clothes], dtype=bool)
+
+    def __len__(self):
+        return len(self.items)
+
+def _fit(features, temperature, humidity):
+    # 推奨範囲からの外れ具合を減点する。範囲が不明な服は一律で少し減点
+    temp_gap = np.maximum(0.0, np.maximum(features.temp_min - temperature, temperature - features.temp_max))
+    score = np.where(np.isnan(temp_gap), -0.5, -temp_gap / 5.0)
+    if humidity is not None:
+        humidity_gap = np.maximum(0.0, np.maximum(features.humidity_min - humidity, humidity - features.humidity_max))
+        score = score + np.where(np.isnan(humidity_gap), 0.0, -humidity_gap / 40.0)
+    return score
+
+def _harmony(features, a, b):
+    # 色の相性（a × b の行列）。無彩色はどの色とも合わせやすいとみなす
+    neutral = (features.saturation < 0.2) | (features.value < 0.2) | np.isnan(features.hue)
+    hue_diff = np.abs(features.hue[a][:, None] - features.hue[b][None, :])
+    hue_diff = np.minimum(hue_diff, 360.0 - hue_diff)
+    score = np.select(
+        [hue_diff <= 30.0, hue_diff >= 150.0, np.abs(hue_diff - 120.0) <= 15.0],
+        [0.8, 0.6, 0.4],
+        default=-0.2,
+    )
+    either_neutral = neutral[a][:, None] | neutral[b][None, :]
+    return np.where(either_neutral, 1.0, score)
+
+def _best_candidates(fit, indices):
+    if len(indices) <= MAX_CANDIDATES:
+        return indices
+    best = np.argpartition(-fit[indices], MAX_CANDIDATES - 1)[:MAX_CANDIDATES]
+    return np.sort(indices[best])
+
+def score_outfits(features, temperature, humidity=None):
+    # 全組み合わせを採点して最高点の (トップス, ボトムス, アウター, 点数) を返す。
+    # ボトムス・アウターがない場合はNone。トップスがなければNone
+    tops, bottoms, jackets = features.top_idx, features.bottom_idx, features.jacket_idx
+    if len(tops) == 0:
+        return None
+    fit = _fit(features, temperature, humidity)
+    # 大きなワードローブでは気温に合う上位の候補だけで組み合わせを作る
+    tops, bottoms, jackets = (_best_candidates(fit, indices) for indices in (tops, bottoms, jackets))
+
+    # トップス×ボトムス（最後の列は「ボトムスなし」）
+    pair = np.empty((len(tops), len(bottoms) + 1))
+    pair[:, -1] = fit[tops] + NO_BOTTOM_PENALTY
+    if len(bottoms):
+        pair[:, :-1] = (
+            fit[tops][:, None] + fit[bottoms][None, :]
+            + _harmony(features, tops, bottoms)
+            - np.abs(features.formality[tops][:, None] - features.formality[bottoms][None, :])
+            - 0.5 * (features.denim[tops][:, None] & features.denim[bottoms][None, :])
+        )
+
+    # アウター（最後の列は「アウターなし」）。寒いときはアウターなしを、暑いときはアウターを減点し、
+    # 色の相性はアウターを選ぶ理由にならないよう減点方向にだけ効かせる
+    no_jacket = -max(0.0, JACKET_THRESHOLD - temperature) / 5.0
+    jacket_score = np.full((len(tops), len(bottoms) + 1, len(jackets) + 1), no_jacket)
+    if len(jackets):
+        top_jacket = 0.5 * (_harmony(features, tops, jackets) - 1.0)
+        bottom_jacket = np.zeros((len(bottoms) + 1, len(jackets)))
+        if len(bottoms):
+            bottom_jacket[:-1] = 0.5 * (_harmony(features, bottoms, jackets) - 1.0)
+        wearing_cost = 0.1 + max(0.0, temperature - JACKET_THRESHOLD) / 5.0
+        jacket_score[:, :, :-1] = (fit[jackets] - wearing_cost)[None, None, :] \
+            + top_jacket[:, None, :] + bottom_jacket[None, :, :]
+        # 同じ服をトップスとアウターの両方には使わない
+        same_item = features.ids[tops][:, None] == features.ids[jackets][None, :]
+        jacket_score[:, :, :-1] = np.where(same_item[:, None, :], -np.inf, jacket_score[:, :, :-1])
+
+    total = pair[:, :, None] + jacket_score
+    t, b, j = np.unravel_index(np.argmax(total), total.shape)
+    return (
+        int(tops[t]),
+        int(bottoms[b]) if b < len(bottoms) else None,
+        int(jackets[j]) if j < len(jackets) else None,
+        float(total[t, b, j]),
+    )
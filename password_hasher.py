@@ -0,0 +1,123 @@
+# ---------------- パスワードのハッシュ化 ----------------
+# scrypt などの鍵導出関数（KDF）は1回に数十ミリ秒CPUを使い、その間GILを握ったままになるので、
+# プロセスプールで計算してリクエストを処理する他のスレッドを止めないようにする。
+# 受け付ける数（計算中＋待ち）に上限を設け、溢れたら PasswordHasherBusy を出す（APIは429を返す）
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+class PasswordHasherBusy(Exception):
+    # 上限まで受け付けている、または時間内に計算が終わらなかった（しばらくしてから再試行できる）
+    pass
+
+
+def normalize_method(method):
+    # werkzeug と同じ既定値を補って "scrypt:32768:8:1" のようにパラメータまで書いた形にする
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        n, r, p = args or (2 ** 15, 8, 1)
+        return f'scrypt:{int(n)}:{int(r)}:{int(p)}'
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    raise ValueError(f'Unsupported password hash method: {method}')
+
+def method_of(password_hash):
+    # ハッシュの先頭の "方式:パラメータ" を返す
+    return password_hash.split('$', 1)[0] if password_hash else None
+
+
+# プロセスプールで実行するのでモジュールのトップレベルに置く
+def _generate(password, method):
+    return generate_password_hash(password, method=method)
+
+def _check(password_hash, password):
+    return check_password_hash(password_hash, password)
+
+
+class PasswordHasher:
+    """パスワードのハッシュ化と照合を max_workers 個のプロセスで行う
+
+    max_workers=0 のときは呼び出したスレッドで計算する（上限の判定は同じ）。
+    プロセスは最初に使うときに起動する。
+    """
+
+    def __init__(self, method='scrypt', max_workers=2, max_pending=32, timeout=10.0):
+        self.method = normalize_method(method)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(max(max_workers, 1) + max_pending)
+        self.executor = None
+        self.lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.counters = {'hashes': 0, 'verifications': 0, 'rejected': 0, 'timeouts': 0}
+
+    def _count(self, **values):
+        with self.stats_lock:
+            for key, value in values.items():
+                self.counters[key] += value
+
+    def _get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                # スレッドを持つプロセスをforkしないよう spawn で起動する
+                self.executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                    mp_context=multiprocessing.get_context('spawn'))
+            return self.executor
+
+    def _run(self, func, *args):
+        if not self.slots.acquire(blocking=False):
+            self._count(rejected=1)
+            raise PasswordHasherBusy('Too many password hashing requests')
+        if self.max_workers <= 0:
+            try:
+                return func(*args)
+            finally:
+                self.slots.release()
+        try:
+            executor = self._get_executor()
+            future = executor.submit(func, *args)
+        except Exception:
+            self.slots.release()
+            raise
+        # 待つのをやめても計算は続くので、枠は計算が終わったときに返す
+        future.add_done_callback(lambda _: self.slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self._count(timeouts=1)
+            raise PasswordHasherBusy('Password hashing timed out')
+        except BrokenProcessPool:
+            # ワーカーが落ちた場合は次の呼び出しでプールを作り直す
+            with self.lock:
+                if self.executor is executor:
+                    self.executor = None
+            raise
+
+    def hash(self, password):
+        self._count(hashes=1)
+        return self._run(_generate, password, self.method)
+
+    def verify(self, password_hash, password):
+        self._count(verifications=1)
+        return self._run(_check, password_hash, password)
+
+    def needs_rehash(self, method):
+        # 保存されている方式・パラメータが今の設定と違えばログイン時に作り直す
+        return method != self.method
+
+    def stats(self):
+        with self.stats_lock:
+            return dict(self.counters)
+
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
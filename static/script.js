@@ -173,26 +173,88 @@ document.getElementById('get-outfit').addEventListener('click', async () => {
         statusEl.textContent = text;
     }
 
-    async function fetchAndRenderOutfit(url) {
-        const response = await fetchWithAuth(url);
-        if (!response) return;
-        const outfit = await response.json();
-        if (Array.isArray(outfit) && outfit.length > 0) {
-            outfit.forEach(item => {
-                const imgContainer = document.createElement('div');
-                imgContainer.classList.add('cloth-item');
+    function renderOutfitItem(item) {
+        const imgContainer = document.createElement('div');
+        imgContainer.classList.add('cloth-item');
+        imgContainer.dataset.clothId = item.id;
+
+        const img = document.createElement('img');
+        // 中サイズの画像があればそちらを使う
+        img.src = `${API_BASE_URL.replace('/api', '')}/static/${item.medium_path || item.image_path}`;
 
-                const img = document.createElement('img');
-                img.src = `${API_BASE_URL.replace('/api', '')}/static/${item.image_path}`;
+        imgContainer.appendChild(img);
+        container.appendChild(imgContainer);
+    }
 
-                imgContainer.appendChild(img);
-                container.appendChild(imgContainer);
-            });
+    function renderOutfit(outfit) {
+        container.innerHTML = '';
+        if (Array.isArray(outfit) && outfit.length > 0) {
+            outfit.forEach(renderOutfitItem);
         } else {
             container.innerHTML = '<p>提案できるコーディネートが見つかりませんでした。</p>';
         }
     }
 
+    function handleOutfitEvent(message) {
+        const { event, data } = message;
+        if (event === 'weather') {
+            const statusEl = document.getElementById('outfit-status');
+            const prefix = statusEl ? `${statusEl.textContent} / ` : '';
+            setOutfitStatus(`${prefix}気温 ${data.temperature}°C, 湿度 ${data.humidity}%`);
+        } else if (event === 'top' || event === 'bottom' || event === 'jacket') {
+            // 決まったものから順に表示する
+            renderOutfitItem(data);
+        } else if (event === 'done') {
+            // 最終的なコーディネートが表示中のものと違う場合（ローカル採点に切り替えた場合）は描き直す
+            const shown = Array.from(container.querySelectorAll('.cloth-item')).map(el => el.dataset.clothId);
+            const ids = data.outfit.map(item => String(item.id));
+            if (shown.join(',') !== ids.join(',')) {
+                renderOutfit(data.outfit);
+            }
+        } else if (event === 'error') {
+            container.innerHTML = `<p>${data.message || data.error || 'コーディネートの取得に失敗しました。'}</p>`;
+        }
+    }
+
+    async function fetchAndRenderOutfit(url) {
+        // 決まった順に1行ずつ返るストリーミングAPIを使う
+        const streamUrl = url.replace('/outfit', '/outfit/stream');
+        const response = await fetchWithAuth(streamUrl);
+        if (!response) return;
+        if (!response.ok) {
+            handleOutfitEvent({ event: 'error', data: await response.json() });
+            return;
+        }
+        if (!response.body) {
+            // ストリームを読めないブラウザでは通常のAPIを使う
+            const fallback = await fetchWithAuth(url);
+            if (fallback) {
+                const result = await fallback.json();
+                if (fallback.ok) {
+                    renderOutfit(result);
+                } else {
+                    handleOutfitEvent({ event: 'error', data: result });
+                }
+            }
+            return;
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            lines.filter(line => line.trim()).forEach(line => handleOutfitEvent(JSON.parse(line)));
+        }
+        if (buffer.trim()) {
+            handleOutfitEvent(JSON.parse(buffer));
+        }
+    }
+
     // Geolocation APIで現在地を取得
     if (navigator.geolocation) {
         const highAccuracyOptions = { enableHighAccuracy: true, timeout: 8000, maximumAge: 0 };
@@ -271,11 +333,24 @@ document.getElementById('show-clothes').addEventListener('click', async () => {
     container.innerHTML = '';
     
     try {
-        const response = await fetchWithAuth(`${API_BASE_URL}/clothes`);
-        if (response) {
+        // 一覧に表示する項目だけを、ページ単位で取得して順に描画する
+        const fields = 'image_path,thumbnail_path,item_type,color_name,color_hex,pattern,material,style,recommended_temp,recommended_humidity';
+        let cursor = null;
+        let count = 0;
+        do {
+            const params = new URLSearchParams({ fields, limit: '100' });
+            if (cursor) {
+                params.set('cursor', cursor);
+            }
+            const response = await fetchWithAuth(`${API_BASE_URL}/clothes?${params}`);
+            if (!response || !response.ok) {
+                break;
+            }
             const clothes = await response.json();
-            
-            if (Array.isArray(clothes) && clothes.length > 0) {
+            cursor = response.headers.get('X-Next-Cursor');
+
+            if (Array.isArray(clothes)) {
+                count += clothes.length;
                 clothes.forEach(cloth => {
                     const clothDiv = document.createElement('div');
                     clothDiv.style.border = '1px solid #ccc';
@@ -285,7 +360,7 @@ document.getElementById('show-clothes').addEventListener('click', async () => {
                     
                     clothDiv.innerHTML = `
                         <div style="display: flex; gap: 10px;">
-                            <img src="${API_BASE_URL.replace('/api', '')}/static/${cloth.image_path}" 
+                            <img src="${API_BASE_URL.replace('/api', '')}/static/${cloth.thumbnail_path || cloth.image_path}" 
                                  style="width: 100px; height: 100px; object-fit: cover; border-radius: 4px;">
                             <div>
                                 <h4>${cloth.item_type || 'Unknown'}</h4>
@@ -301,9 +376,11 @@ document.getElementById('show-clothes').addEventListener('click', async () => {
                     
                     container.appendChild(clothDiv);
                 });
-            } else {
-                container.innerHTML = '<p>登録された服がありません。</p>';
             }
+        } while (cursor);
+
+        if (count === 0) {
+            container.innerHTML = '<p>登録された服がありません。</p>';
         }
     } catch (error) {
         console.error('Failed to fetch clothes:', error);